@@ -0,0 +1,194 @@
+import argparse
+import logging
+import threading
+from typing import Dict, List, Optional
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DIMENSIONS = ['agency', 'naics_code', 'setaside', 'month']
+
+class ContractAnalytics:
+    """Spend rollups over the whole database, computed on cached NumPy columns.
+
+    Each dimension is dictionary-encoded into integer codes with a stable label list.
+    After an ingest, new notices are appended and re-ingested ones (which INSERT OR
+    REPLACE gives a new rowid) are patched in place by notice ID. The cache is rebuilt,
+    archived partitions included, only after bulk updates, deletes or archiving.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.lock = threading.Lock()
+        self._reset()
+        self.rewrite_generation = None  # The first refresh loads the archived partitions
+
+    def _reset(self):
+        self.labels = {dimension: [] for dimension in DIMENSIONS}
+        self._label_codes = {dimension: {} for dimension in DIMENSIONS}
+        self.codes = {dimension: np.empty(0, dtype=np.int32) for dimension in DIMENSIONS}
+        self.values = np.empty(0, dtype=np.float64)
+        self.positions = {}  # notice_id -> index into the columns
+        self.max_id = 0
+        self.archived_count = 0
+        self.rewrite_generation = self.db.rewrite_generation
+
+    def _encode(self, dimension: str, column: np.ndarray) -> np.ndarray:
+        # Encode the distinct labels once, then map every row through np.unique's inverse index
+        uniques, inverse = np.unique(column, return_inverse=True)
+        known = self._label_codes[dimension]
+        for label in uniques:
+            if label not in known:
+                known[label] = len(self.labels[dimension])
+                self.labels[dimension].append(str(label))
+        lookup = np.array([known[label] for label in uniques], dtype=np.int32)
+        return lookup[inverse]
+
+    def refresh(self):
+        """Load rows added or replaced since the last refresh, or everything after a rewrite."""
+        with self.lock:
+            if self.rewrite_generation != self.db.rewrite_generation:
+                self._rebuild()
+            loaded, total = self._load_main()
+            if len(self.values) != total + self.archived_count:
+                # Rows disappeared without a rewrite being recorded; start over
+                self._rebuild()
+                loaded, total = self._load_main()
+            if loaded:
+                logger.info(f"Analytics cache loaded {loaded} rows ({len(self.values)} total)")
+
+    def _load_main(self):
+        """Load main's rows past max_id a page at a time; returns (rows loaded, main's row count)."""
+        loaded = 0
+        while True:
+            total, rows = self.db.get_analytics_rows(self.max_id)
+            if not rows:
+                return loaded, total
+            self._apply(rows)
+            loaded += len(rows)
+
+    def _rebuild(self):
+        """Start over from the archived partitions; main's rows are then loaded from id 0."""
+        self._reset()
+        after = (0, 0)
+        while True:
+            rows = self.db.get_archived_analytics_rows(after)
+            if not rows:
+                break
+            fiscal_years, ids, notice_ids, agencies, naics_codes, setasides, months, values = zip(*rows)
+            self._load(notice_ids, {'agency': agencies, 'naics_code': naics_codes,
+                                    'setaside': setasides, 'month': months}, values)
+            self.archived_count += len(rows)
+            after = (fiscal_years[-1], ids[-1])
+
+    def _apply(self, rows: List[tuple]):
+        if not rows:
+            return
+        ids, notice_ids, agencies, naics_codes, setasides, months, values = zip(*rows)
+        self._load(notice_ids, {'agency': agencies, 'naics_code': naics_codes,
+                                'setaside': setasides, 'month': months}, values)
+        self.max_id = ids[-1]
+
+    def _load(self, notice_ids, columns: Dict, values):
+        """Patch rows for notices already cached and append the rest."""
+        existing = np.array([self.positions.get(notice_id, -1) for notice_id in notice_ids], dtype=np.int64)
+        replaced = existing >= 0
+        new_values = np.nan_to_num(np.array(values, dtype=np.float64))
+        for dimension in DIMENSIONS:
+            column = np.array([label or '' for label in columns[dimension]], dtype=object).astype(str)
+            encoded = self._encode(dimension, column)
+            self.codes[dimension][existing[replaced]] = encoded[replaced]
+            self.codes[dimension] = np.concatenate([self.codes[dimension], encoded[~replaced]])
+        self.values[existing[replaced]] = new_values[replaced]
+        appended = [notice_id for notice_id, was_replaced in zip(notice_ids, replaced) if not was_replaced]
+        self.positions.update(zip(appended, range(len(self.values), len(self.values) + len(appended))))
+        self.values = np.concatenate([self.values, new_values[~replaced]])
+
+    def _mask(self, filters: Optional[Dict[str, List[str]]]) -> Optional[np.ndarray]:
+        if not filters:
+            return None
+        mask = np.ones(len(self.values), dtype=bool)
+        for dimension, wanted in filters.items():
+            known = self._label_codes[dimension]
+            wanted_codes = [known[label] for label in wanted if label in known]
+            mask &= np.isin(self.codes[dimension], wanted_codes)
+        return mask
+
+    def aggregate(self, group_by: List[str], filters: Optional[Dict[str, List[str]]] = None) -> List[Dict]:
+        """Return count and total/average award value per combination of the group_by dimensions."""
+        unknown = [dimension for dimension in group_by if dimension not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Cannot group by: {', '.join(unknown)}")
+        self.refresh()
+        with self.lock:
+            mask = self._mask(filters)
+            values = self.values if mask is None else self.values[mask]
+            # Fold the per-dimension codes into a single int64 group key
+            keys = np.zeros(len(values), dtype=np.int64)
+            for dimension in group_by:
+                codes = self.codes[dimension] if mask is None else self.codes[dimension][mask]
+                keys = keys * max(len(self.labels[dimension]), 1) + codes
+            groups, inverse = np.unique(keys, return_inverse=True)
+            counts = np.bincount(inverse, minlength=len(groups))
+            totals = np.bincount(inverse, weights=values, minlength=len(groups))
+
+            # Unfold the group keys back into per-dimension labels
+            columns = {}
+            remainder = groups
+            for dimension in reversed(group_by):
+                remainder, codes = np.divmod(remainder, max(len(self.labels[dimension]), 1))
+                columns[dimension] = np.array(self.labels[dimension] or [''], dtype=object)[codes]
+
+        if group_by == ['month']:
+            order = np.argsort(columns['month'].astype(str), kind='stable')
+        else:
+            order = np.argsort(-totals, kind='stable')
+        averages = totals / np.maximum(counts, 1)
+        fields = group_by + ['count', 'total', 'average']
+        ordered = [columns[dimension][order].tolist() for dimension in group_by]
+        ordered += [counts[order].tolist(), totals[order].tolist(), averages[order].tolist()]
+        return [dict(zip(fields, row)) for row in zip(*ordered)]
+
+    def value_histogram(self, bins: int = 20, filters: Optional[Dict[str, List[str]]] = None):
+        """Return (counts, edges) of positive award values over log-spaced bins."""
+        self.refresh()
+        with self.lock:
+            mask = self._mask(filters)
+            values = self.values if mask is None else self.values[mask]
+            values = values[values > 0]
+            if not len(values):
+                return np.zeros(bins, dtype=np.int64), np.zeros(bins + 1)
+            edges = np.logspace(np.log10(values.min()), np.log10(values.max()), bins + 1)
+            counts, edges = np.histogram(values, bins=edges)
+            return counts, edges
+
+
+def main():
+    from contract_database import ContractDatabase
+    from utils import format_currency
+
+    parser = argparse.ArgumentParser(description="Summarize contract award values across the database")
+    parser.add_argument("--db", default="contracts.db", help="Path to the contracts database")
+    parser.add_argument("--group-by", nargs="+", default=["agency"], choices=DIMENSIONS,
+                        help="Dimensions to group by")
+    parser.add_argument("--limit", type=int, default=25, help="Number of groups to print")
+    parser.add_argument("--histogram", action="store_true", help="Also print the distribution of award values")
+    args = parser.parse_args()
+
+    db = ContractDatabase(args.db)
+    try:
+        analytics = ContractAnalytics(db)
+        for row in analytics.aggregate(args.group_by)[:args.limit]:
+            labels = " | ".join(row[dimension] or "(none)" for dimension in args.group_by)
+            print(f"{labels}: {row['count']} contracts, {format_currency(row['total'])}")
+        if args.histogram:
+            counts, edges = analytics.value_histogram()
+            print()
+            for count, low, high in zip(counts, edges[:-1], edges[1:]):
+                print(f"{format_currency(low)} - {format_currency(high)}: {count} contracts")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
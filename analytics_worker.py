@@ -0,0 +1,26 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+import logging
+
+logger = logging.getLogger(__name__)
+
+class AnalyticsWorker(QThread):
+    finished = pyqtSignal(object)
+    error = pyqtSignal(str)
+
+    def __init__(self, analytics, group_by=None):
+        super().__init__()
+        self.analytics = analytics
+        self.group_by = group_by
+
+    def run(self):
+        try:
+            # Without group_by, only bring the column cache up to date
+            if self.group_by:
+                rows = self.analytics.aggregate(self.group_by)
+                self.finished.emit((self.group_by, rows, self.analytics.value_histogram()))
+            else:
+                self.analytics.refresh()
+                self.finished.emit(None)
+        except Exception as e:
+            logger.error(f"Error in analytics: {e}", exc_info=True)
+            self.error.emit(str(e))
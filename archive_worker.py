@@ -0,0 +1,24 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+import logging
+
+logger = logging.getLogger(__name__)
+
+class ArchiveWorker(QThread):
+    finished = pyqtSignal(int)
+    progress = pyqtSignal(int, int)
+    error = pyqtSignal(str)
+
+    def __init__(self, db, cutoff_date, vacuum=True):
+        super().__init__()
+        self.db = db
+        self.cutoff_date = cutoff_date
+        self.vacuum = vacuum
+
+    def run(self):
+        try:
+            archived = self.db.archive_contracts(self.cutoff_date, vacuum=self.vacuum,
+                                                 progress_callback=self.progress.emit)
+            self.finished.emit(archived)
+        except Exception as e:
+            logger.error(f"Archiving failed: {e}", exc_info=True)
+            self.error.emit(str(e))
@@ -0,0 +1,30 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+import logging
+
+logger = logging.getLogger(__name__)
+
+class BulkWorker(QThread):
+    finished = pyqtSignal(int)
+    progress = pyqtSignal(int, int)
+    error = pyqtSignal(str)
+
+    def __init__(self, db, contract_ids, query, update_data=None):
+        super().__init__()
+        self.db = db
+        self.contract_ids = contract_ids
+        self.query = query
+        self.update_data = update_data
+
+    def run(self):
+        try:
+            # Update when update_data is given, otherwise delete
+            if self.update_data:
+                count = self.db.bulk_update(self.contract_ids, self.update_data, query=self.query,
+                                            progress_callback=self.progress.emit)
+            else:
+                count = self.db.bulk_delete(self.contract_ids, query=self.query,
+                                            progress_callback=self.progress.emit)
+            self.finished.emit(count)
+        except Exception as e:
+            logger.error(f"Bulk operation failed: {e}", exc_info=True)
+            self.error.emit(str(e))
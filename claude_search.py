@@ -1,116 +1,240 @@
 import anthropic
 import json
 import logging
+from request_scheduler import BACKGROUND, INTERACTIVE, RequestScheduler
 
 logger = logging.getLogger(__name__)
 
 class ClaudeSearch:
-    def __init__(self, api_key: str):
-        self.client = anthropic.Anthropic(api_key=api_key)
+    def __init__(self, api_key: str, scheduler: RequestScheduler = None, base_url: str = None):
+        # Retries are handled by the scheduler so that backoff is shared across callers
+        self.client = anthropic.Anthropic(api_key=api_key, base_url=base_url, max_retries=0)
         self.model = "claude-3-sonnet-20240229"  # Use the latest model available
+        self.scheduler = scheduler or RequestScheduler()
 
-    def enhance_query(self, user_query: str) -> str:
-        try:
-            message = self.client.messages.create(
+    def _estimate_tokens(self, prompt: str, max_tokens: int) -> int:
+        # Roughly four characters per token, plus the full output allowance
+        return len(prompt) // 4 + max_tokens
+
+    def _create(self, prompt: str, max_tokens: int, priority: int = INTERACTIVE) -> str:
+        """Send a single-message request through the scheduler and return the response text."""
+        message = self.scheduler.submit(
+            lambda: self.client.messages.create(
+                model=self.model,
+                max_tokens=max_tokens,
+                messages=[
+                    {"role": "user", "content": prompt}
+                ]
+            ),
+            self._estimate_tokens(prompt, max_tokens),
+            priority
+        )
+        return message.content[0].text
+
+    def _stream_text(self, prompt: str, max_tokens: int, on_text=None, should_stop=None,
+                     priority: int = INTERACTIVE) -> str:
+        """Stream a completion, reporting the accumulated text as tokens arrive."""
+        streamed = {}
+
+        def stream_once():
+            # The scheduler settles its token estimate against the returned message's usage
+            streamed['text'] = ""
+            with self.client.messages.stream(
                 model=self.model,
-                max_tokens=100,
+                max_tokens=max_tokens,
                 messages=[
-                    {"role": "user", "content": f"Enhance the following search query for government contracts: {user_query}"}
+                    {"role": "user", "content": prompt}
                 ]
-            )
-            return message.content[0].text
+            ) as stream:
+                for delta in stream.text_stream:
+                    streamed['text'] += delta
+                    if on_text:
+                        on_text(streamed['text'])
+                    if should_stop and should_stop():
+                        # Usage so far, without reading the rest of the stream
+                        return stream.current_message_snapshot
+                return stream.get_final_message()
+
+        self.scheduler.submit(stream_once, self._estimate_tokens(prompt, max_tokens), priority)
+        return streamed['text']
+
+    def enhance_query(self, user_query: str) -> str:
+        try:
+            return self._create(f"Enhance the following search query for government contracts: {user_query}", 100)
         except Exception as e:
             logger.error(f"Error in enhance_query: {e}")
             return user_query  # Return original query if enhancement fails
 
+    def _relevance_prompt(self, contracts: list, user_query: str) -> str:
+        prompt = f"Analyze the relevance of the following contracts to this query: {user_query}\n\n"
+        for contract in contracts[:10]:  # Limit to 10 contracts to avoid token limit
+            prompt += f"Contract: {json.dumps(contract)}\n"
+        prompt += "\nProvide a relevance score (0-100) and brief explanation for each contract."
+        return prompt
+
+    def _parse_relevance(self, contracts: list, analysis_parts: list) -> list:
+        # Parse the response and add relevance scores to contracts
+        analyzed_contracts = []
+        for contract, analysis_part in zip(contracts, analysis_parts):
+            try:
+                score = float(analysis_part.split(":")[1].split()[0])
+                explanation = ":".join(analysis_part.split(":")[2:]).strip()
+                analyzed_contracts.append({**contract, "relevance_score": score, "explanation": explanation})
+            except Exception as e:
+                logger.error(f"Error parsing contract analysis: {e}")
+                analyzed_contracts.append({**contract, "relevance_score": 0, "explanation": "Analysis failed"})
+        return analyzed_contracts
+
     def advanced_analyze_contracts(self, contracts_key: str, user_query: str) -> list:
         try:
             contracts = json.loads(contracts_key)
-            prompt = f"Analyze the relevance of the following contracts to this query: {user_query}\n\n"
-            for contract in contracts[:10]:  # Limit to 10 contracts to avoid token limit
-                prompt += f"Contract: {json.dumps(contract)}\n"
-            prompt += "\nProvide a relevance score (0-100) and brief explanation for each contract."
-            
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=1000,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            # Parse the response and add relevance scores to contracts
-            analyzed_contracts = []
-            analysis = message.content[0].text
-            for contract, analysis_part in zip(contracts, analysis.strip().split("\n\n")):
-                try:
-                    score = float(analysis_part.split(":")[1].split()[0])
-                    explanation = ":".join(analysis_part.split(":")[2:]).strip()
-                    analyzed_contracts.append({**contract, "relevance_score": score, "explanation": explanation})
-                except Exception as e:
-                    logger.error(f"Error parsing contract analysis: {e}")
-                    analyzed_contracts.append({**contract, "relevance_score": 0, "explanation": "Analysis failed"})
-            
-            return analyzed_contracts
+            analysis = self._create(self._relevance_prompt(contracts, user_query), 1000)
+            return self._parse_relevance(contracts, analysis.strip().split("\n\n"))
         except Exception as e:
             logger.error(f"Error in advanced_analyze_contracts: {e}")
             return contracts  # Return original contracts if analysis fails
 
+    def stream_analyze_contracts(self, contracts_key: str, user_query: str, on_update=None, should_stop=None) -> list:
+        """Like advanced_analyze_contracts, but reports scored contracts as each analysis completes.
+
+        Contracts that have not been scored yet are passed through unchanged.
+        """
+        contracts = json.loads(contracts_key)
+        scored = 0
+
+        def handle_text(text):
+            nonlocal scored
+            complete_parts = text.strip().split("\n\n")[:-1]  # The last part may still be streaming
+            if on_update and len(complete_parts) > scored:
+                scored = len(complete_parts)
+                analyzed = self._parse_relevance(contracts, complete_parts)
+                on_update(analyzed + contracts[len(analyzed):])
+
+        try:
+            analysis = self._stream_text(self._relevance_prompt(contracts, user_query), 1000, handle_text, should_stop)
+            analyzed = self._parse_relevance(contracts, analysis.strip().split("\n\n"))
+            return analyzed + contracts[len(analyzed):]
+        except Exception as e:
+            logger.error(f"Error in stream_analyze_contracts: {e}")
+            return contracts  # Return original contracts if analysis fails
+
+    def _summary_prompt(self, results: list) -> str:
+        prompt = "Summarize the following government contract search results:\n\n"
+        for result in results[:5]:  # Summarize top 5 results
+            prompt += f"Title: {result.get('title', 'N/A')}\n"
+            prompt += f"Agency: {result.get('agency', 'N/A')}\n"
+            prompt += f"Relevance: {result.get('relevance_score', 'N/A')}\n\n"
+        prompt += "Summary:"
+        return prompt
+
     def summarize_results(self, result_key: str) -> str:
         try:
-            results = json.loads(result_key)
-            prompt = "Summarize the following government contract search results:\n\n"
-            for result in results[:5]:  # Summarize top 5 results
-                prompt += f"Title: {result.get('title', 'N/A')}\n"
-                prompt += f"Agency: {result.get('agency', 'N/A')}\n"
-                prompt += f"Relevance: {result.get('relevance_score', 'N/A')}\n\n"
-            prompt += "Summary:"
-            
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=200,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            return message.content[0].text.strip()
+            return self._create(self._summary_prompt(json.loads(result_key)), 200).strip()
         except Exception as e:
             logger.error(f"Error in summarize_results: {e}")
             return "Unable to generate summary due to an error."
 
+    def stream_summarize_results(self, result_key: str, on_update=None, should_stop=None) -> str:
+        """Like summarize_results, but reports the partial summary as it is generated."""
+        try:
+            on_text = (lambda text: on_update(text.strip())) if on_update else None
+            return self._stream_text(self._summary_prompt(json.loads(result_key)), 200, on_text, should_stop).strip()
+        except Exception as e:
+            logger.error(f"Error in stream_summarize_results: {e}")
+            return "Unable to generate summary due to an error."
+
+    def _entities_prompt(self, contracts: list) -> str:
+        prompt = "Extract key entities from the following government contracts. Focus on Organizations, Locations, Technologies, Key Personnel, and Important Dates.\n\n"
+        for contract in contracts[:5]:  # Limit to 5 contracts
+            prompt += f"Contract: {json.dumps(contract)}\n\n"
+        prompt += "Extracted Entities:"
+        return prompt
+
+    def _parse_entities(self, text: str) -> dict:
+        # Parse the response into a structured format
+        entities = {
+            "Organizations": [],
+            "Locations": [],
+            "Technologies": [],
+            "Key Personnel": [],
+            "Important Dates": []
+        }
+        current_category = None
+        for line in text.strip().split("\n"):
+            line = line.strip()
+            if line in entities:
+                current_category = line
+            elif current_category and line:
+                entities[current_category].append(line)
+        return entities
+
     def extract_entities(self, contracts_key: str) -> dict:
         try:
-            contracts = json.loads(contracts_key)
-            prompt = "Extract key entities from the following government contracts. Focus on Organizations, Locations, Technologies, Key Personnel, and Important Dates.\n\n"
-            for contract in contracts[:5]:  # Limit to 5 contracts
-                prompt += f"Contract: {json.dumps(contract)}\n\n"
-            prompt += "Extracted Entities:"
-            
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=500,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
-            )
-            
-            # Parse the response into a structured format
-            entities = {
-                "Organizations": [],
-                "Locations": [],
-                "Technologies": [],
-                "Key Personnel": [],
-                "Important Dates": []
-            }
-            current_category = None
-            for line in message.content[0].text.strip().split("\n"):
-                line = line.strip()
-                if line in entities:
-                    current_category = line
-                elif current_category and line:
-                    entities[current_category].append(line)
-            
-            return entities
+            return self._parse_entities(self._create(self._entities_prompt(json.loads(contracts_key)), 500))
         except Exception as e:
             logger.error(f"Error in extract_entities: {e}")
             return {}  # Return empty dict if extraction fails
+
+    def stream_extract_entities(self, contracts_key: str, on_update=None, should_stop=None) -> dict:
+        """Like extract_entities, but reports the entities parsed so far as the response streams."""
+        try:
+            on_text = (lambda text: on_update(self._parse_entities(text))) if on_update else None
+            text = self._stream_text(self._entities_prompt(json.loads(contracts_key)), 500, on_text, should_stop)
+            return self._parse_entities(text)
+        except Exception as e:
+            logger.error(f"Error in stream_extract_entities: {e}")
+            return {}  # Return empty dict if extraction fails
+
+    def _enrichment_prompt(self, contract: dict) -> str:
+        return (
+            "Extract key entities and category tags from the following government contract. "
+            "Respond with JSON only, in the form "
+            '{"entities": {"Organizations": [], "Locations": [], "Technologies": [], "Key Personnel": [], '
+            '"Important Dates": []}, "tags": []}. '
+            "Tags should be short lowercase labels for the kind of work, such as \"cybersecurity\" or \"construction\".\n\n"
+            f"Contract: {json.dumps(contract)}"
+        )
+
+    def parse_enrichment(self, text: str) -> tuple:
+        """Parse an enrichment response into (entities, tags)."""
+        result = json.loads(text[text.index("{"):text.rindex("}") + 1])
+        entities = self._parse_entities("")  # Empty dict with the standard categories
+        for category, values in result.get("entities", {}).items():
+            if category in entities:
+                entities[category] = [str(value).strip() for value in values if str(value).strip()]
+        tags = sorted({str(tag).strip().lower() for tag in result.get("tags", []) if str(tag).strip()})
+        return entities, tags
+
+    def enrich_contract(self, contract: dict, priority: int = BACKGROUND) -> str:
+        return self._create(self._enrichment_prompt(contract), 500, priority)
+
+    def submit_enrichment_batch(self, contracts: list) -> str:
+        """Submit contracts as a Message Batch; custom IDs are the contracts' positions in the list."""
+        requests = [
+            {
+                "custom_id": f"c{index}",
+                "params": {
+                    "model": self.model,
+                    "max_tokens": 500,
+                    "messages": [
+                        {"role": "user", "content": self._enrichment_prompt(contract)}
+                    ]
+                }
+            }
+            for index, contract in enumerate(contracts)
+        ]
+        batch = self.scheduler.submit(lambda: self.client.messages.batches.create(requests=requests), 1, BACKGROUND)
+        return batch.id
+
+    def enrichment_batch_ended(self, batch_id: str) -> bool:
+        batch = self.scheduler.submit(lambda: self.client.messages.batches.retrieve(batch_id), 1, BACKGROUND)
+        return batch.processing_status == "ended"
+
+    def enrichment_batch_results(self, batch_id: str) -> dict:
+        """Map each contract's position in the batch to its response text, or None if it failed."""
+        entries = self.scheduler.submit(lambda: list(self.client.messages.batches.results(batch_id)), 1, BACKGROUND)
+        results = {}
+        for entry in entries:
+            index = int(entry.custom_id[1:])
+            results[index] = entry.result.message.content[0].text if entry.result.type == "succeeded" else None
+        return results
@@ -1,78 +1,317 @@
+import functools
+import os
 import sqlite3
-from typing import List, Dict
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 import json
 import logging
-from utils import create_search_query, validate_contract_data
+from utils import build_search_clause, canonicalize_query, chunked, validate_contract_data
 
 logger = logging.getLogger(__name__)
 
+# Table column -> SAM.gov CSV field stored in the data blob
+COLUMN_FIELDS = {
+    'notice_id': 'Notice ID',
+    'title': 'Title',
+    'agency': 'Department/Ind. Agency',
+    'sub_tier': 'Sub-Tier',
+    'naics_code': 'NAICS Code',
+    'psc_code': 'PSC Code',
+    'date_posted': 'Date Posted',
+    'type': 'Type',
+    'base_period': 'Base Period',
+    'option_periods': 'Option Periods',
+    'delivery_order': 'Delivery Order/Task Order/BOA Order',
+    'synopsis': 'Synopsis',
+    'setaside': 'SETASIDE',
+    'response_date': 'Response Date',
+    'award_date': 'Award Date',
+    'award_number': 'Award Number',
+    'contract_award_value': 'Contract Award Value',
+    'contractor_name': 'Contractor Name',
+    'contract_description': 'Contract Description',
+    'primary_poc': 'Primary Point of Contact',
+    'secondary_poc': 'Secondary Point of Contact',
+}
+
+BULK_CHUNK_SIZE = 5000
+
+# Enrichment failures (exhausted retries, unparsable or expired results) are retried up to this many times
+MAX_ENRICHMENT_ATTEMPTS = 3
+
+# Rows per analytics fetch; the lock is released between pages so searches are not held up
+ANALYTICS_PAGE_SIZE = 20000
+
+# Counts and pages kept per write generation, bounded by the contracts they hold (a count weighs one);
+# larger results (e.g. exports) bypass the cache
+RESULT_CACHE_ROW_BUDGET = 2000
+RESULT_CACHE_MAX_ROWS = 500
+
+# Archive partitions attached at once; SQLite allows 10 attachments by default
+PARTITION_ATTACH_LIMIT = 8
+
+# Federal fiscal year of date_posted (FY2020 runs from 2019-10-01 to 2020-09-30)
+FISCAL_YEAR_SQL = "CAST(substr(date_posted, 1, 4) AS INTEGER) + (CAST(substr(date_posted, 6, 2) AS INTEGER) >= 10)"
+
+def synchronized(method):
+    """Serialize access to the shared connection and result cache."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
+
 class ContractDatabase:
     def __init__(self, db_path: str = 'contracts.db'):
         self.db_path = db_path
-        self.conn = sqlite3.connect(db_path)
+        # Shared with background workers; every public method holds self.lock
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.write_generation = 0
+        # Bumped only when existing rows change, so readers can tell appends from rewrites
+        self.rewrite_generation = 0
+        self._result_cache = OrderedDict()
+        self._cached_rows = 0
+        self._attached = OrderedDict()  # fiscal year -> schema name, least recently used first
         self.create_tables()
 
+    def _create_contracts_table(self, schema: str = 'main'):
+        self.conn.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.contracts (
+                id INTEGER PRIMARY KEY,
+                notice_id TEXT UNIQUE,
+                title TEXT,
+                agency TEXT,
+                sub_tier TEXT,
+                naics_code TEXT,
+                psc_code TEXT,
+                date_posted TEXT,
+                type TEXT,
+                base_period TEXT,
+                option_periods TEXT,
+                delivery_order TEXT,
+                synopsis TEXT,
+                setaside TEXT,
+                response_date TEXT,
+                award_date TEXT,
+                award_number TEXT,
+                contract_award_value REAL,
+                contractor_name TEXT,
+                contract_description TEXT,
+                primary_poc TEXT,
+                secondary_poc TEXT,
+                data JSON
+            )
+        ''')
+        for column in ('agency', 'naics_code', 'setaside', 'date_posted'):
+            self.conn.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_contracts_{column} ON contracts ({column})')
+
     def create_tables(self):
         with self.conn:
+            self._create_contracts_table()
+
+            # AI enrichment results, filled in offline by enrichment.EnrichmentPipeline
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS contract_entities (
+                    notice_id TEXT,
+                    category TEXT,
+                    entity TEXT,
+                    PRIMARY KEY (notice_id, category, entity)
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_contract_entities_entity ON contract_entities (entity, category)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS contract_tags (
+                    notice_id TEXT,
+                    tag TEXT,
+                    PRIMARY KEY (notice_id, tag)
+                )
+            ''')
+            self.conn.execute('CREATE INDEX IF NOT EXISTS idx_contract_tags_tag ON contract_tags (tag)')
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS enrichment_state (
+                    notice_id TEXT PRIMARY KEY,
+                    status TEXT,
+                    batch_id TEXT,
+                    attempts INTEGER DEFAULT 0,
+                    updated_at TEXT DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            state_columns = [row[1] for row in self.conn.execute('PRAGMA table_info(enrichment_state)')]
+            if 'attempts' not in state_columns:
+                self.conn.execute('ALTER TABLE enrichment_state ADD COLUMN attempts INTEGER DEFAULT 0')
             self.conn.execute('''
-                CREATE TABLE IF NOT EXISTS contracts (
-                    id INTEGER PRIMARY KEY,
-                    notice_id TEXT UNIQUE,
-                    title TEXT,
-                    agency TEXT,
-                    sub_tier TEXT,
-                    naics_code TEXT,
-                    psc_code TEXT,
-                    date_posted TEXT,
-                    type TEXT,
-                    base_period TEXT,
-                    option_periods TEXT,
-                    delivery_order TEXT,
-                    synopsis TEXT,
-                    setaside TEXT,
-                    response_date TEXT,
-                    award_date TEXT,
-                    award_number TEXT,
-                    contract_award_value REAL,
-                    contractor_name TEXT,
-                    contract_description TEXT,
-                    primary_poc TEXT,
-                    secondary_poc TEXT,
-                    data JSON
+                CREATE TABLE IF NOT EXISTS enrichment_batches (
+                    batch_id TEXT PRIMARY KEY,
+                    notice_ids JSON,
+                    status TEXT,
+                    created_at TEXT DEFAULT CURRENT_TIMESTAMP
                 )
             ''')
 
+            # Archive partitions: one SQLite file per fiscal year, attached on demand
+            self.conn.execute('''
+                CREATE TABLE IF NOT EXISTS partitions (
+                    fiscal_year INTEGER PRIMARY KEY,
+                    path TEXT,
+                    min_date TEXT,
+                    max_date TEXT,
+                    row_count INTEGER
+                )
+            ''')
+            # Notices currently being moved to a partition keep their enrichment rows
+            self.conn.execute('CREATE TABLE IF NOT EXISTS archive_moves (notice_id TEXT PRIMARY KEY)')
+            self.conn.execute('DROP TRIGGER IF EXISTS contracts_enrichment_cleanup')
+            self.conn.execute('''
+                CREATE TRIGGER contracts_enrichment_cleanup AFTER DELETE ON contracts
+                WHEN NOT EXISTS (SELECT 1 FROM archive_moves WHERE notice_id = OLD.notice_id)
+                BEGIN
+                    DELETE FROM contract_entities WHERE notice_id = OLD.notice_id;
+                    DELETE FROM contract_tags WHERE notice_id = OLD.notice_id;
+                    DELETE FROM enrichment_state WHERE notice_id = OLD.notice_id;
+                END
+            ''')
+
+    @synchronized
     def insert_contracts(self, contracts: List[Dict]):
         valid_contracts = [contract for contract in contracts if validate_contract_data(contract)]
+        columns = list(COLUMN_FIELDS) + ['data']
         with self.conn:
-            self.conn.executemany('''
-                INSERT OR REPLACE INTO contracts (
-                    notice_id, title, agency, sub_tier, naics_code, psc_code, date_posted,
-                    type, base_period, option_periods, delivery_order, synopsis, setaside,
-                    response_date, award_date, award_number, contract_award_value,
-                    contractor_name, contract_description, primary_poc, secondary_poc, data
-                ) VALUES (
-                    :Notice ID, :Title, :Department/Ind. Agency, :Sub-Tier, :NAICS Code,
-                    :PSC Code, :Date Posted, :Type, :Base Period, :Option Periods,
-                    :Delivery Order/Task Order/BOA Order, :Synopsis, :SETASIDE,
-                    :Response Date, :Award Date, :Award Number, :Contract Award Value,
-                    :Contractor Name, :Contract Description, :Primary Point of Contact,
-                    :Secondary Point of Contact, :data
-                )
-            ''', [{**contract, 'data': json.dumps(contract)} for contract in valid_contracts])
+            self.conn.executemany(f'''
+                INSERT OR REPLACE INTO contracts ({', '.join(columns)})
+                VALUES ({', '.join(['?'] * len(columns))})
+            ''', [[contract.get(field) for field in COLUMN_FIELDS.values()] + [json.dumps(contract)]
+                  for contract in valid_contracts])
+        # A re-ingested notice replaces its archived copy, so it only lives in main
+        self._stage_ids(contract['Notice ID'] for contract in valid_contracts)
+        for partition in self._overlapping_partitions():
+            schema = self._schema(partition)
+            with self.conn:
+                removed = self.conn.execute(f'''
+                    DELETE FROM {schema}.contracts WHERE notice_id IN (SELECT notice_id FROM temp.bulk_ids)
+                ''').rowcount
+            if removed:
+                self._update_partition_stats(partition)
+                self.rewrite_generation += 1
+        self.invalidate_cache()
         logger.info(f"Inserted {len(valid_contracts)} contracts into the database")
 
+    @synchronized
+    def invalidate_cache(self):
+        """Bump the write generation so cached counts and pages are no longer served."""
+        self.write_generation += 1
+        self._result_cache.clear()
+        self._cached_rows = 0
+
+    def _cache_get(self, key: Tuple):
+        cache_key = (self.write_generation,) + key
+        if cache_key not in self._result_cache:
+            return None
+        self._result_cache.move_to_end(cache_key)
+        return self._result_cache[cache_key]
+
+    @staticmethod
+    def _cache_weight(value) -> int:
+        return max(len(value), 1) if isinstance(value, list) else 1
+
+    def _cache_put(self, key: Tuple, value):
+        if isinstance(value, list) and len(value) > RESULT_CACHE_MAX_ROWS:
+            return
+        cache_key = (self.write_generation,) + key
+        if cache_key in self._result_cache:
+            self._cached_rows -= self._cache_weight(self._result_cache.pop(cache_key))
+        self._result_cache[cache_key] = value
+        self._cached_rows += self._cache_weight(value)
+        # Evict least recently used entries until the cached contracts fit the budget
+        while self._cached_rows > RESULT_CACHE_ROW_BUDGET:
+            _, evicted = self._result_cache.popitem(last=False)
+            self._cached_rows -= self._cache_weight(evicted)
+
+    def _partition_path(self, fiscal_year: int) -> str:
+        base, extension = os.path.splitext(self.db_path)
+        return f"{base}_fy{fiscal_year}{extension or '.db'}"
+
+    def _attach_partition(self, fiscal_year: int, path: str) -> str:
+        """Attach a partition file if needed, detaching the least recently used beyond the limit.
+
+        Callers use one partition at a time and re-attach through _schema before each use,
+        so a detach never pulls out a schema that a statement still needs.
+        """
+        schema = f"fy{fiscal_year}"
+        if fiscal_year in self._attached:
+            self._attached.move_to_end(fiscal_year)
+            return schema
+        while len(self._attached) >= PARTITION_ATTACH_LIMIT:
+            _, oldest = self._attached.popitem(last=False)
+            self.conn.execute(f"DETACH DATABASE {oldest}")
+        self.conn.execute(f"ATTACH DATABASE ? AS {schema}", [path])
+        self._attached[fiscal_year] = schema
+        return schema
+
+    def _schema(self, partition: Optional[Tuple[int, str]]) -> str:
+        """Return the schema name for a partition (None is main), attaching it if needed."""
+        return 'main' if partition is None else self._attach_partition(*partition)
+
+    def _overlapping_partitions(self, query: Optional[Dict] = None) -> List[Tuple[int, str]]:
+        """Return (fiscal_year, path) of every partition whose date_posted range overlaps the query's date filter."""
+        start = query.get('date_posted_start') if query else None
+        end = query.get('date_posted_end') if query else None
+        cursor = self.conn.execute(
+            'SELECT fiscal_year, path, min_date, max_date FROM partitions WHERE row_count > 0 ORDER BY fiscal_year DESC')
+        partitions = []
+        for fiscal_year, path, min_date, max_date in cursor.fetchall():
+            if end and min_date[:10] > end:
+                continue
+            if start and max_date[:10] < start:
+                continue
+            partitions.append((fiscal_year, path))
+        return partitions
+
+    def _schema_where(self, schema: str, where_clause: str) -> str:
+        """Add the de-duplication rule to a partition's WHERE clause: a notice also in main is served from main."""
+        if schema == 'main':
+            return where_clause
+        rule = "notice_id NOT IN (SELECT notice_id FROM main.contracts)"
+        return f"{where_clause} AND {rule}" if where_clause else f"WHERE {rule}"
+
+    def _update_partition_stats(self, partition: Tuple[int, str]):
+        fiscal_year, path = partition
+        schema = self._schema(partition)
+        with self.conn:
+            self.conn.execute(f'''
+                INSERT OR REPLACE INTO partitions (fiscal_year, path, min_date, max_date, row_count)
+                SELECT ?, ?, MIN(date_posted), MAX(date_posted), COUNT(*) FROM {schema}.contracts
+            ''', [fiscal_year, path])
+
+    @synchronized
     def search_contracts(self, query: Dict, limit: int = 100, offset: int = 0) -> List[Dict]:
-        where_clause = create_search_query(query)
-        sql = f'''
-            SELECT data FROM contracts
-            {where_clause}
-            LIMIT ? OFFSET ?
-        '''
+        cache_key = ('page', canonicalize_query(query), limit, offset)
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return list(cached)
+        where_clause, params = build_search_clause(query)
         try:
-            with self.conn:
-                cursor = self.conn.execute(sql, list(query.values()) + [limit, offset])
-                return [json.loads(row[0]) for row in cursor.fetchall()]
+            # Main first, then each overlapping partition; the offset is consumed across them in order
+            contracts = []
+            for partition in [None] + self._overlapping_partitions(query):
+                schema = self._schema(partition)
+                schema_where = self._schema_where(schema, where_clause)
+                with self.conn:
+                    if offset:
+                        matches = self.conn.execute(f"SELECT COUNT(*) FROM {schema}.contracts {schema_where}",
+                                                    params).fetchone()[0]
+                        if matches <= offset:
+                            offset -= matches
+                            continue
+                    cursor = self.conn.execute(f"SELECT data FROM {schema}.contracts {schema_where} LIMIT ? OFFSET ?",
+                                               params + [limit - len(contracts), offset])
+                    contracts += [json.loads(row[0]) for row in cursor.fetchall()]
+                offset = 0
+                if len(contracts) >= limit:
+                    break
+            self._cache_put(cache_key, contracts)
+            return list(contracts)
         except sqlite3.Error as e:
             logger.error(f"Database error: {e}")
             return []
@@ -80,16 +319,23 @@ class ContractDatabase:
             logger.error(f"Unexpected error in search_contracts: {e}")
             return []
 
+    @synchronized
     def get_total_count(self, query: Dict) -> int:
-        where_clause = create_search_query(query)
-        sql = f'''
-            SELECT COUNT(*) FROM contracts
-            {where_clause}
-        '''
+        cache_key = ('count', canonicalize_query(query))
+        cached = self._cache_get(cache_key)
+        if cached is not None:
+            return cached
+        where_clause, params = build_search_clause(query)
         try:
-            with self.conn:
-                cursor = self.conn.execute(sql, list(query.values()))
-                return cursor.fetchone()[0]
+            total = 0
+            for partition in [None] + self._overlapping_partitions(query):
+                schema = self._schema(partition)
+                with self.conn:
+                    cursor = self.conn.execute(
+                        f"SELECT COUNT(*) FROM {schema}.contracts {self._schema_where(schema, where_clause)}", params)
+                    total += cursor.fetchone()[0]
+            self._cache_put(cache_key, total)
+            return total
         except sqlite3.Error as e:
             logger.error(f"Database error in get_total_count: {e}")
             return 0
@@ -97,18 +343,93 @@ class ContractDatabase:
             logger.error(f"Unexpected error in get_total_count: {e}")
             return 0
 
-    def bulk_update(self, contract_ids: List[str], update_data: Dict):
+    def _stage_ids(self, contract_ids: Iterable[str]):
+        """Load notice IDs into temp.bulk_ids for joins."""
+        with self.conn:
+            self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_ids (notice_id TEXT PRIMARY KEY)')
+            self.conn.execute('DELETE FROM temp.bulk_ids')
+            self.conn.executemany('INSERT OR IGNORE INTO temp.bulk_ids (notice_id) VALUES (?)',
+                                  ((contract_id,) for contract_id in contract_ids))
+
+    def _stage_targets(self, contract_ids: Optional[Iterable[str]],
+                       query: Optional[Dict]) -> List[Tuple[Optional[Tuple[int, str]], List[int]]]:
+        """Collect the row ids hit by a bulk operation in main and in each partition it reaches."""
+        if (contract_ids is None) == (query is None):
+            raise ValueError("Provide exactly one of contract_ids or query")
+        if contract_ids is not None:
+            self._stage_ids(contract_ids)
+            partitions = self._overlapping_partitions()
+            where_clause, params = "WHERE notice_id IN (SELECT notice_id FROM temp.bulk_ids)", []
+        else:
+            partitions = self._overlapping_partitions(query)
+            where_clause, params = build_search_clause(query)
+            if not where_clause:
+                raise ValueError("A query-based bulk operation needs at least one search criterion")
+        targets = []
+        for partition in [None] + partitions:
+            schema = self._schema(partition)
+            cursor = self.conn.execute(
+                f"SELECT id FROM {schema}.contracts {self._schema_where(schema, where_clause)} ORDER BY id", params)
+            target_ids = [row[0] for row in cursor.fetchall()]
+            if target_ids:
+                targets.append((partition, target_ids))
+        return targets
+
+    def _run_chunked(self, statements: Callable[[str], List[str]], params: List, targets: List,
+                     progress_callback: Optional[Callable[[int, int], None]]) -> int:
+        """Apply the statements built for each schema to its staged targets, one chunk per transaction.
+
+        Statements select their rows with "id IN (SELECT target_id FROM temp.bulk_targets)".
+        """
+        total = sum(len(target_ids) for _, target_ids in targets)
+        processed = 0
+        with self.conn:
+            self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_targets (target_id INTEGER PRIMARY KEY)')
+        for partition, target_ids in targets:
+            schema = self._schema(partition)
+            for chunk in chunked(target_ids, BULK_CHUNK_SIZE):
+                with self.conn:
+                    self.conn.execute('DELETE FROM temp.bulk_targets')
+                    self.conn.executemany('INSERT INTO temp.bulk_targets (target_id) VALUES (?)',
+                                          [(target_id,) for target_id in chunk])
+                    for sql in statements(schema):
+                        self.conn.execute(sql, params if '?' in sql else [])
+                processed += len(chunk)
+                if progress_callback:
+                    progress_callback(processed, total)
+            if partition is not None:
+                self._update_partition_stats(partition)
+        return processed
+
+    @synchronized
+    def bulk_update(self, contract_ids: Optional[Iterable[str]], update_data: Dict, query: Optional[Dict] = None,
+                    progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """Update contracts by notice ID or by search query, keeping the data blob in sync.
+
+        Archived partitions reached by the IDs or the query's date filter are updated too.
+        """
+        unknown = [key for key in update_data if key not in COLUMN_FIELDS or key == 'notice_id']
+        if unknown:
+            raise ValueError(f"Cannot bulk update fields: {', '.join(unknown)}")
         set_clause = ", ".join([f"{key} = ?" for key in update_data.keys()])
-        sql = f'''
-            UPDATE contracts
-            SET {set_clause}
-            WHERE notice_id IN ({','.join(['?'] * len(contract_ids))})
-        '''
-        params = list(update_data.values()) + contract_ids
+        json_paths = ", ".join(['?, ?'] * len(update_data))
+        statements = lambda schema: [f'''
+            UPDATE {schema}.contracts
+            SET {set_clause}, data = json_set(data, {json_paths})
+            WHERE id IN (SELECT target_id FROM temp.bulk_targets)
+        ''']
+        params = list(update_data.values())
+        for key, value in update_data.items():
+            params += [f'$."{COLUMN_FIELDS[key]}"', value]
         try:
-            with self.conn:
-                self.conn.execute(sql, params)
-            logger.info(f"Bulk updated {len(contract_ids)} contracts")
+            targets = self._stage_targets(contract_ids, query)
+            try:
+                updated = self._run_chunked(statements, params, targets, progress_callback)
+            finally:
+                self.rewrite_generation += 1
+                self.invalidate_cache()
+            logger.info(f"Bulk updated {updated} contracts")
+            return updated
         except sqlite3.Error as e:
             logger.error(f"Database error in bulk_update: {e}")
             raise
@@ -116,15 +437,28 @@ class ContractDatabase:
             logger.error(f"Unexpected error in bulk_update: {e}")
             raise
 
-    def bulk_delete(self, contract_ids: List[str]):
-        sql = f'''
-            DELETE FROM contracts
-            WHERE notice_id IN ({','.join(['?'] * len(contract_ids))})
-        '''
+    @synchronized
+    def bulk_delete(self, contract_ids: Optional[Iterable[str]], query: Optional[Dict] = None,
+                    progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """Delete contracts by notice ID or by search query, including matches in archived partitions."""
+        def statements(schema):
+            targets = f"SELECT notice_id FROM {schema}.contracts WHERE id IN (SELECT target_id FROM temp.bulk_targets)"
+            # Main's delete trigger removes enrichment rows; partitions have no trigger
+            cleanup = [] if schema == 'main' else [
+                f"DELETE FROM {table} WHERE notice_id IN ({targets})"
+                for table in ('contract_entities', 'contract_tags', 'enrichment_state')
+            ]
+            return cleanup + [f"DELETE FROM {schema}.contracts WHERE id IN (SELECT target_id FROM temp.bulk_targets)"]
+
         try:
-            with self.conn:
-                self.conn.execute(sql, contract_ids)
-            logger.info(f"Bulk deleted {len(contract_ids)} contracts")
+            targets = self._stage_targets(contract_ids, query)
+            try:
+                deleted = self._run_chunked(statements, [], targets, progress_callback)
+            finally:
+                self.rewrite_generation += 1
+                self.invalidate_cache()
+            logger.info(f"Bulk deleted {deleted} contracts")
+            return deleted
         except sqlite3.Error as e:
             logger.error(f"Database error in bulk_delete: {e}")
             raise
@@ -132,6 +466,178 @@ class ContractDatabase:
             logger.error(f"Unexpected error in bulk_delete: {e}")
             raise
 
+    def archive_contracts(self, cutoff_date: str, vacuum: bool = False,
+                          progress_callback: Optional[Callable[[int, int], None]] = None) -> int:
+        """Move notices whose archive (or else response, or else posted) date is before cutoff_date
+        into per-fiscal-year partition files, keyed by the fiscal year the notice was posted in.
+
+        The lock is taken per chunk, so searches can run between chunks; each chunk leaves every
+        notice either in main or in its partition. Enrichment rows stay in main, keyed by notice ID.
+        """
+        if self.db_path == ':memory:':
+            raise ValueError("Partitioning requires a file-backed database")
+        with self.lock:
+            rows = self.conn.execute(f'''
+                SELECT id, {FISCAL_YEAR_SQL} FROM contracts
+                WHERE COALESCE(NULLIF(json_extract(data, '$."Archive Date"'), ''),
+                               NULLIF(response_date, ''), date_posted) < ?
+                ORDER BY id
+            ''', [cutoff_date]).fetchall()
+        by_year = {}
+        for row_id, fiscal_year in rows:
+            by_year.setdefault(fiscal_year, []).append(row_id)
+
+        columns = ', '.join(list(COLUMN_FIELDS) + ['data'])
+        moved = 0
+        for fiscal_year, row_ids in sorted(by_year.items()):
+            partition = (fiscal_year, self._partition_path(fiscal_year))
+            for chunk in chunked(row_ids, BULK_CHUNK_SIZE):
+                with self.lock:
+                    # Re-attach per chunk: a search in between may have detached the partition
+                    schema = self._schema(partition)
+                    with self.conn:
+                        self._create_contracts_table(schema)
+                        self.conn.execute('CREATE TEMP TABLE IF NOT EXISTS bulk_targets (target_id INTEGER PRIMARY KEY)')
+                        self.conn.execute('DELETE FROM temp.bulk_targets')
+                        self.conn.executemany('INSERT INTO temp.bulk_targets (target_id) VALUES (?)',
+                                              [(row_id,) for row_id in chunk])
+                        targets = 'SELECT target_id FROM temp.bulk_targets'
+                        self.conn.execute(f'''
+                            INSERT OR REPLACE INTO {schema}.contracts ({columns})
+                            SELECT {columns} FROM main.contracts WHERE id IN ({targets})
+                        ''')
+                        self.conn.execute(f'''
+                            INSERT OR IGNORE INTO archive_moves (notice_id)
+                            SELECT notice_id FROM main.contracts WHERE id IN ({targets})
+                        ''')
+                        self.conn.execute(f'DELETE FROM main.contracts WHERE id IN ({targets})')
+                        self.conn.execute('DELETE FROM archive_moves')
+                    self._update_partition_stats(partition)
+                    self.rewrite_generation += 1
+                    self.invalidate_cache()
+                moved += len(chunk)
+                if progress_callback:
+                    progress_callback(moved, len(rows))
+        if vacuum:
+            with self.lock:
+                self.conn.execute('VACUUM main')
+        logger.info(f"Archived {moved} contracts into {len(by_year)} fiscal-year partitions")
+        return moved
+
+    @synchronized
+    def get_unenriched_contracts(self, limit: int = 100) -> List[Dict]:
+        """Return contracts that are neither enriched nor pending, including failures with attempts left."""
+        cursor = self.conn.execute('''
+            SELECT data FROM contracts c
+            WHERE NOT EXISTS (
+                SELECT 1 FROM enrichment_state e
+                WHERE e.notice_id = c.notice_id AND (e.status != 'failed' OR e.attempts >= ?)
+            )
+            LIMIT ?
+        ''', [MAX_ENRICHMENT_ATTEMPTS, limit])
+        return [json.loads(row[0]) for row in cursor.fetchall()]
+
+    @synchronized
+    def count_unenriched_contracts(self) -> int:
+        return self.conn.execute('''
+            SELECT COUNT(*) FROM contracts c
+            WHERE NOT EXISTS (
+                SELECT 1 FROM enrichment_state e
+                WHERE e.notice_id = c.notice_id AND (e.status != 'failed' OR e.attempts >= ?)
+            )
+        ''', [MAX_ENRICHMENT_ATTEMPTS]).fetchone()[0]
+
+    @synchronized
+    def record_enrichment_batch(self, batch_id: str, notice_ids: List[str]):
+        """Checkpoint a submitted batch so its results can be collected after a restart."""
+        with self.conn:
+            self.conn.execute('INSERT INTO enrichment_batches (batch_id, notice_ids, status) VALUES (?, ?, ?)',
+                              [batch_id, json.dumps(notice_ids), 'pending'])
+            self.conn.executemany('''
+                INSERT INTO enrichment_state (notice_id, status, batch_id) VALUES (?, 'pending', ?)
+                ON CONFLICT(notice_id) DO UPDATE SET status = 'pending', batch_id = excluded.batch_id
+            ''', [(notice_id, batch_id) for notice_id in notice_ids])
+
+    @synchronized
+    def get_pending_enrichment_batches(self) -> List[Tuple[str, List[str]]]:
+        cursor = self.conn.execute("SELECT batch_id, notice_ids FROM enrichment_batches WHERE status = 'pending'")
+        return [(batch_id, json.loads(notice_ids)) for batch_id, notice_ids in cursor.fetchall()]
+
+    @synchronized
+    def save_enrichments(self, results: List[Tuple[str, Optional[Dict], List[str]]], batch_id: Optional[str] = None):
+        """Store extracted entities and tags; a result with entities of None marks the contract failed."""
+        with self.conn:
+            for notice_id, entities, tags in results:
+                self.conn.execute('DELETE FROM contract_entities WHERE notice_id = ?', [notice_id])
+                self.conn.execute('DELETE FROM contract_tags WHERE notice_id = ?', [notice_id])
+                if entities is None:
+                    status = 'failed'
+                else:
+                    status = 'done'
+                    self.conn.executemany(
+                        'INSERT OR IGNORE INTO contract_entities (notice_id, category, entity) VALUES (?, ?, ?)',
+                        [(notice_id, category, entity) for category, values in entities.items() for entity in values])
+                    self.conn.executemany('INSERT OR IGNORE INTO contract_tags (notice_id, tag) VALUES (?, ?)',
+                                          [(notice_id, tag) for tag in tags])
+                # Failures keep their attempt count so they are retried a bounded number of times
+                self.conn.execute('''
+                    INSERT INTO enrichment_state (notice_id, status, batch_id, attempts) VALUES (?, ?, ?, 1)
+                    ON CONFLICT(notice_id) DO UPDATE SET
+                        status = excluded.status, batch_id = excluded.batch_id,
+                        attempts = attempts + 1, updated_at = CURRENT_TIMESTAMP
+                ''', [notice_id, status, batch_id])
+            if batch_id:
+                self.conn.execute("UPDATE enrichment_batches SET status = 'ended' WHERE batch_id = ?", [batch_id])
+        self.invalidate_cache()
+        logger.info(f"Saved enrichment for {len(results)} contracts")
+
+    @synchronized
+    def get_tags(self) -> List[str]:
+        return [row[0] for row in self.conn.execute('SELECT DISTINCT tag FROM contract_tags ORDER BY tag')]
+
+    @synchronized
+    def get_analytics_rows(self, after_id: int = 0, limit: int = ANALYTICS_PAGE_SIZE) -> Tuple[int, List[Tuple]]:
+        """Return the table's row count and the typed analytics columns of up to limit rows with id > after_id."""
+        total = self.conn.execute('SELECT COUNT(*) FROM contracts').fetchone()[0]
+        cursor = self.conn.execute('''
+            SELECT id, notice_id, agency, naics_code, setaside, substr(date_posted, 1, 7),
+                   CAST(REPLACE(REPLACE(contract_award_value, '$', ''), ',', '') AS REAL)
+            FROM contracts
+            WHERE id > ?
+            ORDER BY id
+            LIMIT ?
+        ''', [after_id, limit])
+        return total, cursor.fetchall()
+
+    @synchronized
+    def get_archived_analytics_rows(self, after: Tuple[int, int] = (0, 0),
+                                    limit: int = ANALYTICS_PAGE_SIZE) -> List[Tuple]:
+        """Return the analytics columns of up to limit archived notices not also in main.
+
+        Rows are (fiscal_year, id, ...) in that order; pass the first two fields of the last row
+        as after to continue.
+        """
+        after_year, after_id = after
+        rows = []
+        for partition in sorted(self._overlapping_partitions()):
+            fiscal_year = partition[0]
+            if fiscal_year < after_year:
+                continue
+            schema = self._schema(partition)
+            cursor = self.conn.execute(f'''
+                SELECT ?, id, notice_id, agency, naics_code, setaside, substr(date_posted, 1, 7),
+                       CAST(REPLACE(REPLACE(contract_award_value, '$', ''), ',', '') AS REAL)
+                FROM {schema}.contracts
+                {self._schema_where(schema, 'WHERE id > ?')}
+                ORDER BY id
+                LIMIT ?
+            ''', [fiscal_year, after_id if fiscal_year == after_year else 0, limit - len(rows)])
+            rows += cursor.fetchall()
+            if len(rows) >= limit:
+                break
+        return rows
+
+    @synchronized
     def close(self):
         self.conn.close()
         logger.info("Database connection closed")
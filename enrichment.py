@@ -0,0 +1,131 @@
+import argparse
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Seconds between stop checks while waiting for a batch to finish
+STOP_CHECK_INTERVAL = 0.2
+
+class EnrichmentPipeline:
+    """Extract entities and category tags for every contract in the database.
+
+    Contracts are walked in chunks. With use_batches, each chunk is submitted as a
+    Message Batch and checkpointed in enrichment_batches, so an interrupted run picks
+    up its pending batches on the next start. Otherwise each chunk is sent as
+    concurrent background-priority requests (e.g. against a local stand-in server)
+    and saved when the chunk completes.
+    """
+
+    def __init__(self, db, claude_search, chunk_size: int = 100, use_batches: bool = True,
+                 max_workers: int = 4, poll_interval: float = 30.0):
+        self.db = db
+        self.claude_search = claude_search
+        self.chunk_size = chunk_size
+        self.use_batches = use_batches
+        self.max_workers = max_workers
+        self.poll_interval = poll_interval
+        self.enriched = 0
+
+    def _parse(self, notice_id, text):
+        if text is None:
+            return notice_id, None, []
+        try:
+            entities, tags = self.claude_search.parse_enrichment(text)
+            return notice_id, entities, tags
+        except Exception as e:
+            logger.error(f"Failed to parse enrichment for {notice_id}: {e}")
+            return notice_id, None, []
+
+    def _enrich_one(self, contract):
+        try:
+            return self._parse(contract['Notice ID'], self.claude_search.enrich_contract(contract))
+        except Exception as e:
+            logger.error(f"Failed to enrich {contract['Notice ID']}: {e}")
+            return contract['Notice ID'], None, []
+
+    def _wait(self, seconds, should_stop) -> bool:
+        """Sleep in short steps so a stop request is noticed quickly; returns False if stopped."""
+        deadline = time.monotonic() + seconds
+        while not (should_stop and should_stop()):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            time.sleep(min(remaining, STOP_CHECK_INTERVAL))
+        return False
+
+    def _collect_batch(self, batch_id, notice_ids, should_stop):
+        while not self.claude_search.enrichment_batch_ended(batch_id):
+            if not self._wait(self.poll_interval, should_stop):
+                return False
+        texts = self.claude_search.enrichment_batch_results(batch_id)
+        results = [self._parse(notice_id, texts.get(index)) for index, notice_id in enumerate(notice_ids)]
+        self.db.save_enrichments(results, batch_id=batch_id)
+        self.enriched += len(results)
+        return True
+
+    def run(self, progress_callback=None, should_stop=None) -> int:
+        """Enrich until no contracts are left or should_stop() is true; returns the number processed."""
+        pending = self.db.get_pending_enrichment_batches()
+        total = self.db.count_unenriched_contracts() + sum(len(notice_ids) for _, notice_ids in pending)
+        self.enriched = 0
+
+        def report():
+            if progress_callback:
+                progress_callback(self.enriched, total)
+
+        if self.use_batches:
+            while not (should_stop and should_stop()):
+                contracts = self.db.get_unenriched_contracts(self.chunk_size)
+                if not contracts:
+                    break
+                batch_id = self.claude_search.submit_enrichment_batch(contracts)
+                notice_ids = [contract['Notice ID'] for contract in contracts]
+                self.db.record_enrichment_batch(batch_id, notice_ids)
+                pending.append((batch_id, notice_ids))
+                logger.info(f"Submitted enrichment batch {batch_id} with {len(contracts)} contracts")
+            for batch_id, notice_ids in pending:
+                if not self._collect_batch(batch_id, notice_ids, should_stop):
+                    break
+                report()
+        else:
+            with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+                while not (should_stop and should_stop()):
+                    contracts = self.db.get_unenriched_contracts(self.chunk_size)
+                    if not contracts:
+                        break
+                    results = list(executor.map(self._enrich_one, contracts))
+                    self.db.save_enrichments(results)
+                    self.enriched += len(results)
+                    report()
+
+        logger.info(f"Enrichment run processed {self.enriched} contracts")
+        return self.enriched
+
+
+def main():
+    from claude_search import ClaudeSearch
+    from contract_database import ContractDatabase
+
+    parser = argparse.ArgumentParser(description="Enrich stored contracts with AI-extracted entities and tags")
+    parser.add_argument("--api-key", required=True, help="Anthropic API key")
+    parser.add_argument("--db", default="contracts.db", help="Path to the contracts database")
+    parser.add_argument("--base-url", help="Alternative API base URL, e.g. a local stand-in server")
+    parser.add_argument("--chunk-size", type=int, default=100, help="Contracts per batch or request round")
+    parser.add_argument("--concurrent", action="store_true",
+                        help="Send concurrent requests instead of Message Batches")
+    args = parser.parse_args()
+
+    db = ContractDatabase(args.db)
+    try:
+        pipeline = EnrichmentPipeline(db, ClaudeSearch(args.api_key, base_url=args.base_url),
+                                      chunk_size=args.chunk_size, use_batches=not args.concurrent)
+        pipeline.run(progress_callback=lambda done, total: logger.info(f"Enriched {done} of {total} contracts"))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    from utils import setup_logging
+    setup_logging()
+    main()
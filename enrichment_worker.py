@@ -0,0 +1,22 @@
+from PyQt5.QtCore import QThread, pyqtSignal
+import logging
+from enrichment import EnrichmentPipeline
+
+logger = logging.getLogger(__name__)
+
+class EnrichmentWorker(QThread):
+    finished = pyqtSignal(int)
+    progress = pyqtSignal(int, int)
+    error = pyqtSignal(str)
+
+    def __init__(self, claude_search, db):
+        super().__init__()
+        self.pipeline = EnrichmentPipeline(db, claude_search)
+
+    def run(self):
+        try:
+            enriched = self.pipeline.run(self.progress.emit, self.isInterruptionRequested)
+            self.finished.emit(enriched)
+        except Exception as e:
+            logger.error(f"Error in contract enrichment: {e}", exc_info=True)
+            self.error.emit(str(e))
@@ -6,13 +6,19 @@ from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
                              QPushButton, QLineEdit, QTextEdit, QListWidget, QLabel, 
                              QCheckBox, QProgressBar, QFileDialog, QMessageBox, QComboBox,
                              QDateEdit, QTabWidget, QGroupBox, QTableWidget, QTableWidgetItem,
-                             QHeaderView, QAbstractItemView, QMenu, QAction)
+                             QHeaderView, QAbstractItemView, QMenu, QAction, QInputDialog)
 from PyQt5.QtCore import Qt, QDate
 from PyQt5.QtGui import QKeySequence
+from analytics import DIMENSIONS, ContractAnalytics
+from analytics_worker import AnalyticsWorker
+from archive_worker import ArchiveWorker
+from bulk_worker import BulkWorker
 from claude_search import ClaudeSearch
-from contract_database import ContractDatabase
+from contract_database import COLUMN_FIELDS, ContractDatabase
+from page_prefetcher import PagePrefetcher
+from enrichment_worker import EnrichmentWorker
 from search_worker import SearchWorker
-from utils import logger, parse_date, format_currency, sanitize_input
+from utils import logger, parse_date, format_currency
 
 class MainWindow(QMainWindow):
     def __init__(self):
@@ -26,13 +32,24 @@ class MainWindow(QMainWindow):
             QMessageBox.critical(self, "Database Error", f"Failed to initialize database: {e}")
             raise
 
+        self.analytics = ContractAnalytics(self.db)
         self.claude_search = None
         self.current_page = 1
         self.contracts_per_page = 50
         self.total_contracts = 0
         self.current_query = {}
+        self.prefetchers = []
+        self.search_worker = None
+        self.cancelled_workers = []
+        self.enrichment_worker = None
+        self.bulk_worker = None
+        self.archive_worker = None
+        self.analytics_workers = []
+        self.ai_summary = ""
+        self.ai_entities = {}
 
         self.init_ui()
+        self.start_analytics_worker()  # Load the analytics columns in the background
 
     def init_ui(self):
         central_widget = QWidget()
@@ -46,6 +63,9 @@ class MainWindow(QMainWindow):
         file_button.clicked.connect(self.load_csv)
         file_layout.addWidget(self.file_entry)
         file_layout.addWidget(file_button)
+        archive_button = QPushButton("Archive Old Notices")
+        archive_button.clicked.connect(self.archive_old_notices)
+        file_layout.addWidget(archive_button)
         main_layout.addLayout(file_layout)
 
         # API Key input
@@ -57,6 +77,9 @@ class MainWindow(QMainWindow):
         api_key_button = QPushButton("Set API Key")
         api_key_button.clicked.connect(self.set_api_key)
         api_key_layout.addWidget(api_key_button)
+        self.enrich_button = QPushButton("Enrich Database")
+        self.enrich_button.clicked.connect(self.enrich_database)
+        api_key_layout.addWidget(self.enrich_button)
         main_layout.addLayout(api_key_layout)
 
         # Search options
@@ -138,22 +161,68 @@ class MainWindow(QMainWindow):
         value_layout.addWidget(self.contract_value_max)
         advanced_layout.addLayout(value_layout)
 
+        # Filters on AI enrichment results
+        enrichment_layout = QHBoxLayout()
+        enrichment_layout.addWidget(QLabel("Tag:"))
+        self.tag_entry = QLineEdit()
+        enrichment_layout.addWidget(self.tag_entry)
+        enrichment_layout.addWidget(QLabel("Entity:"))
+        self.entity_entry = QLineEdit()
+        enrichment_layout.addWidget(self.entity_entry)
+        advanced_layout.addLayout(enrichment_layout)
+
         tabs.addTab(advanced_tab, "Advanced Search")
 
+        # Analytics Tab
+        analytics_tab = QWidget()
+        analytics_layout = QVBoxLayout(analytics_tab)
+
+        group_layout = QHBoxLayout()
+        group_layout.addWidget(QLabel("Group By:"))
+        self.group_by_combo = QComboBox()
+        self.group_by_combo.addItems(DIMENSIONS)
+        group_layout.addWidget(self.group_by_combo)
+        group_layout.addWidget(QLabel("Then By:"))
+        self.then_by_combo = QComboBox()
+        self.then_by_combo.addItems([''] + DIMENSIONS)
+        group_layout.addWidget(self.then_by_combo)
+        self.analytics_button = QPushButton("Run Analysis")
+        self.analytics_button.clicked.connect(self.run_analytics)
+        group_layout.addWidget(self.analytics_button)
+        analytics_layout.addLayout(group_layout)
+
+        self.analytics_table = QTableWidget()
+        self.analytics_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        analytics_layout.addWidget(self.analytics_table)
+
+        analytics_layout.addWidget(QLabel("Award Value Distribution:"))
+        self.histogram_table = QTableWidget(0, 2)
+        self.histogram_table.setHorizontalHeaderLabels(["Award Value", "Contracts"])
+        self.histogram_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        analytics_layout.addWidget(self.histogram_table)
+
+        tabs.addTab(analytics_tab, "Analytics")
+
         # Progress bar
         self.progress_bar = QProgressBar()
         main_layout.addWidget(self.progress_bar)
 
         # Results table
         self.results_table = QTableWidget()
-        self.results_table.setColumnCount(7)
-        self.results_table.setHorizontalHeaderLabels(["Notice ID", "Title", "Agency", "Date Posted", "Type", "Set-Aside", "Contract Value"])
+        self.results_table.setColumnCount(8)
+        self.results_table.setHorizontalHeaderLabels(["Notice ID", "Title", "Agency", "Date Posted", "Type", "Set-Aside", "Contract Value", "Relevance"])
         self.results_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         self.results_table.setSelectionBehavior(QAbstractItemView.SelectRows)
         self.results_table.setContextMenuPolicy(Qt.CustomContextMenu)
         self.results_table.customContextMenuRequested.connect(self.show_context_menu)
         main_layout.addWidget(self.results_table)
 
+        # Claude summary and entities, filled in as responses stream
+        self.insights_view = QTextEdit()
+        self.insights_view.setReadOnly(True)
+        self.insights_view.setMaximumHeight(150)
+        main_layout.addWidget(self.insights_view)
+
         # Pagination
         pagination_layout = QHBoxLayout()
         self.prev_button = QPushButton("Previous")
@@ -191,6 +260,60 @@ class MainWindow(QMainWindow):
         else:
             QMessageBox.warning(self, "Warning", "Please enter an API key")
 
+    def archive_old_notices(self):
+        # Default to the start of the fiscal year two years back
+        today = QDate.currentDate()
+        fiscal_year = today.year() + (1 if today.month() >= 10 else 0)
+        default_cutoff = QDate(fiscal_year - 3, 10, 1).toString(Qt.ISODate)
+        cutoff, ok = QInputDialog.getText(self, "Archive Old Notices",
+                                          "Move notices with an archive/response date before (YYYY-MM-DD):",
+                                          text=default_cutoff)
+        if not ok or not parse_date(cutoff.strip()):
+            return
+
+        # Input stays disabled until the move and VACUUM finish
+        self.centralWidget().setEnabled(False)
+        self.archive_worker = ArchiveWorker(self.db, cutoff.strip())
+        self.archive_worker.progress.connect(self.update_bulk_progress)
+        self.archive_worker.finished.connect(self.on_archive_finished)
+        self.archive_worker.error.connect(self.on_archive_error)
+        self.archive_worker.start()
+
+    def on_archive_finished(self, archived):
+        self.centralWidget().setEnabled(True)
+        QMessageBox.information(self, "Success", f"Archived {archived} contracts into fiscal-year partitions")
+        if self.current_query:
+            self.total_contracts = self.db.get_total_count(self.current_query)
+            self.load_page(1)
+
+    def on_archive_error(self, error):
+        self.centralWidget().setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to archive contracts: {error}")
+
+    def enrich_database(self):
+        if not self.claude_search:
+            QMessageBox.warning(self, "Warning", "Please set your Anthropic API key first")
+            return
+        if self.enrichment_worker and self.enrichment_worker.isRunning():
+            self.enrichment_worker.requestInterruption()
+            self.enrich_button.setText("Enrich Database")
+            return
+
+        self.enrichment_worker = EnrichmentWorker(self.claude_search, self.db)
+        self.enrichment_worker.progress.connect(self.update_bulk_progress)
+        self.enrichment_worker.finished.connect(self.on_enrichment_finished)
+        self.enrichment_worker.error.connect(self.on_enrichment_error)
+        self.enrich_button.setText("Stop Enrichment")
+        self.enrichment_worker.start()
+
+    def on_enrichment_finished(self, enriched):
+        self.enrich_button.setText("Enrich Database")
+        QMessageBox.information(self, "Info", f"Enriched {enriched} contracts")
+
+    def on_enrichment_error(self, error):
+        self.enrich_button.setText("Enrich Database")
+        QMessageBox.critical(self, "Error", f"Enrichment failed: {error}")
+
      def load_csv(self):
       file_path, _ = QFileDialog.getOpenFileName(self, "Select CSV File", "", "CSV Files (*.csv)")
       if file_path:
@@ -209,6 +332,7 @@ class MainWindow(QMainWindow):
                       contracts.append(row)
             
               self.db.insert_contracts(contracts)
+              self.start_analytics_worker()
               self.update_agency_list()
               self.update_setaside_options()
               QMessageBox.information(self, "Info", f"Loaded {len(contracts)} contracts")
@@ -239,6 +363,46 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Warning", f"Failed to update set-aside options: {e}")
             logger.error(f"Failed to update set-aside options: {e}", exc_info=True)
 
+    def start_analytics_worker(self, group_by=None):
+        # Keep running workers referenced until their thread exits
+        self.analytics_workers = [worker for worker in self.analytics_workers if worker.isRunning()]
+        worker = AnalyticsWorker(self.analytics, group_by)
+        worker.finished.connect(self.on_analytics_finished)
+        worker.error.connect(self.on_analytics_error)
+        self.analytics_workers.append(worker)
+        worker.start()
+
+    def run_analytics(self):
+        group_by = [self.group_by_combo.currentText()]
+        if self.then_by_combo.currentText() and self.then_by_combo.currentText() not in group_by:
+            group_by.append(self.then_by_combo.currentText())
+        self.analytics_button.setEnabled(False)
+        self.start_analytics_worker(group_by)
+
+    def on_analytics_finished(self, results):
+        if results is None:  # Cache refresh only
+            return
+        group_by, rows, (counts, edges) = results
+        self.analytics_button.setEnabled(True)
+        self.analytics_table.setColumnCount(len(group_by) + 3)
+        self.analytics_table.setHorizontalHeaderLabels(group_by + ["Contracts", "Total Value", "Average Value"])
+        self.analytics_table.setRowCount(len(rows))
+        for row, result in enumerate(rows):
+            for column, dimension in enumerate(group_by):
+                self.analytics_table.setItem(row, column, QTableWidgetItem(result[dimension]))
+            self.analytics_table.setItem(row, len(group_by), QTableWidgetItem(str(result['count'])))
+            self.analytics_table.setItem(row, len(group_by) + 1, QTableWidgetItem(format_currency(result['total'])))
+            self.analytics_table.setItem(row, len(group_by) + 2, QTableWidgetItem(format_currency(result['average'])))
+
+        self.histogram_table.setRowCount(len(counts))
+        for row, (count, low, high) in enumerate(zip(counts, edges[:-1], edges[1:])):
+            self.histogram_table.setItem(row, 0, QTableWidgetItem(f"{format_currency(low)} - {format_currency(high)}"))
+            self.histogram_table.setItem(row, 1, QTableWidgetItem(str(count)))
+
+    def on_analytics_error(self, error):
+        self.analytics_button.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Analysis failed: {error}")
+
     def perform_search(self):
         query = self.get_full_query()
         if not query:
@@ -246,6 +410,8 @@ class MainWindow(QMainWindow):
             return
 
         self.progress_bar.setRange(0, 0)  # Indeterminate progress
+        self.cancel_search()
+        self.cancel_prefetch()
         self.current_query = query
         self.current_page = 1
 
@@ -257,22 +423,26 @@ class MainWindow(QMainWindow):
     def get_full_query(self):
         query = {}
         if self.keyword_entry.text():
-            query['keyword'] = sanitize_input(self.keyword_entry.text())
+            query['keyword'] = self.keyword_entry.text()
         if self.date_posted_start.date() != self.date_posted_start.minimumDate():
             query['date_posted_start'] = self.date_posted_start.date().toString(Qt.ISODate)
         if self.date_posted_end.date() != self.date_posted_end.minimumDate():
             query['date_posted_end'] = self.date_posted_end.date().toString(Qt.ISODate)
         if self.agency_list.selectedItems():
-            query['agency'] = [sanitize_input(item.text()) for item in self.agency_list.selectedItems()]
+            query['agency'] = [item.text() for item in self.agency_list.selectedItems()]
         if self.naics_entry.text():
-            query['naics_code'] = sanitize_input(self.naics_entry.text())
+            query['naics_code'] = self.naics_entry.text()
         if self.psc_entry.text():
-            query['psc_code'] = sanitize_input(self.psc_entry.text())
+            query['psc_code'] = self.psc_entry.text()
         if self.setaside_combo.currentText():
-            query['setaside'] = sanitize_input(self.setaside_combo.currentText())
+            query['setaside'] = self.setaside_combo.currentText()
         if self.contract_value_min.text() or self.contract_value_max.text():
-            query['contract_award_value'] = (sanitize_input(self.contract_value_min.text()), 
-                                             sanitize_input(self.contract_value_max.text()))
+            query['contract_award_value'] = (self.contract_value_min.text(), 
+                                             self.contract_value_max.text())
+        if self.tag_entry.text():
+            query['tag'] = self.tag_entry.text().strip().lower()
+        if self.entity_entry.text():
+            query['entity'] = self.entity_entry.text().strip()
         return query
 
     def basic_search(self, query):
@@ -291,17 +461,58 @@ class MainWindow(QMainWindow):
             QMessageBox.warning(self, "Warning", "Please set your Anthropic API key first")
             return
 
-        self.search_worker = SearchWorker(self.claude_search, self.db, query)
+        self.ai_summary = ""
+        self.ai_entities = {}
+        self.insights_view.clear()
+        self.search_worker = SearchWorker(self.claude_search, self.db, query, limit=self.contracts_per_page)
+        self.search_worker.results_ready.connect(self.on_search_results)
+        self.search_worker.analysis_progress.connect(self.on_analysis_progress)
+        self.search_worker.summary_progress.connect(self.on_summary_progress)
+        self.search_worker.entities_progress.connect(self.on_entities_progress)
         self.search_worker.finished.connect(self.on_search_finished)
         self.search_worker.error.connect(self.on_search_error)
         self.search_worker.start()
 
+    def cancel_search(self):
+        # Keep cancelled workers referenced until their thread exits
+        self.cancelled_workers = [worker for worker in self.cancelled_workers if worker.isRunning()]
+        if self.search_worker and self.search_worker.isRunning():
+            self.search_worker.requestInterruption()
+            for signal in (self.search_worker.results_ready, self.search_worker.analysis_progress,
+                           self.search_worker.summary_progress, self.search_worker.entities_progress,
+                           self.search_worker.finished, self.search_worker.error):
+                signal.disconnect()
+            self.cancelled_workers.append(self.search_worker)
+        self.search_worker = None
+
+    def on_search_results(self, contracts):
+        # The worker fetches the first page; page controls follow the full match count
+        self.total_contracts = self.db.get_total_count(self.current_query)
+        if self.current_page == 1:
+            self.display_results(contracts)
+        self.update_pagination()
+
+    def on_analysis_progress(self, contracts):
+        # Scores belong to the first page; leave other pages alone while they stream
+        if self.current_page == 1:
+            self.display_results(contracts)
+
+    def on_summary_progress(self, summary):
+        self.ai_summary = summary
+        self.display_insights()
+
+    def on_entities_progress(self, entities):
+        self.ai_entities = entities
+        self.display_insights()
+
     def on_search_finished(self, results):
         enhanced_query, analyzed_contracts, summary, entities = results
         self.keyword_entry.setText(enhanced_query)
-        self.display_results(analyzed_contracts)
-        self.display_entities(entities)
-        QMessageBox.information(self, "Claude Summary", summary)
+        if self.current_page == 1:
+            self.display_results(analyzed_contracts)
+        self.ai_summary = summary
+        self.ai_entities = entities
+        self.display_insights()
         self.progress_bar.setRange(0, 100)
         self.progress_bar.setValue(100)
 
@@ -317,10 +528,26 @@ class MainWindow(QMainWindow):
             self.display_results(contracts)
             self.current_page = page
             self.update_pagination()
+            self.start_prefetch()
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to load page: {e}")
             logger.error(f"Failed to load page: {e}", exc_info=True)
 
+    def start_prefetch(self):
+        self.cancel_prefetch()
+        total_pages = (self.total_contracts - 1) // self.contracts_per_page + 1
+        pages = [page for page in (self.current_page + 1, self.current_page - 1) if 1 <= page <= total_pages]
+        if not pages:
+            return
+        prefetcher = PagePrefetcher(self.db, self.current_query, pages, self.contracts_per_page)
+        prefetcher.finished.connect(lambda: self.prefetchers.remove(prefetcher))
+        self.prefetchers.append(prefetcher)
+        prefetcher.start()
+
+    def cancel_prefetch(self):
+        for prefetcher in self.prefetchers:
+            prefetcher.requestInterruption()
+
     def display_results(self, contracts):
         self.results_table.setRowCount(len(contracts))
         for row, contract in enumerate(contracts):
@@ -331,6 +558,7 @@ class MainWindow(QMainWindow):
             self.results_table.setItem(row, 4, QTableWidgetItem(contract.get('Type', '')))
             self.results_table.setItem(row, 5, QTableWidgetItem(contract.get('SETASIDE', '')))
             self.results_table.setItem(row, 6, QTableWidgetItem(format_currency(float(contract.get('Contract Award Value', 0)))))
+            self.results_table.setItem(row, 7, QTableWidgetItem(str(contract.get('relevance_score', ''))))
 
     def update_pagination(self):
         total_pages = (self.total_contracts - 1) // self.contracts_per_page + 1
@@ -350,6 +578,9 @@ class MainWindow(QMainWindow):
         menu = QMenu()
         bulk_update_action = menu.addAction("Bulk Update")
         bulk_delete_action = menu.addAction("Bulk Delete")
+        menu.addSeparator()
+        update_matches_action = menu.addAction("Update All Matches")
+        delete_matches_action = menu.addAction("Delete All Matches")
         
         action = menu.exec_(self.results_table.mapToGlobal(position))
         
@@ -357,45 +588,86 @@ class MainWindow(QMainWindow):
             self.bulk_update()
         elif action == bulk_delete_action:
             self.bulk_delete()
+        elif action == update_matches_action:
+            self.bulk_update(all_matches=True)
+        elif action == delete_matches_action:
+            self.bulk_delete(all_matches=True)
 
-    def bulk_update(self):
+    def selected_contract_ids(self):
         selected_rows = set(index.row() for index in self.results_table.selectedIndexes())
-        if not selected_rows:
+        return [self.results_table.item(row, 0).text() for row in selected_rows]
+
+    def update_bulk_progress(self, processed, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(processed)
+
+    def start_bulk_operation(self, contract_ids, query, update_data=None):
+        # Input stays disabled until the worker finishes so operations cannot overlap
+        self.centralWidget().setEnabled(False)
+        self.bulk_worker = BulkWorker(self.db, contract_ids, query, update_data)
+        self.bulk_worker.progress.connect(self.update_bulk_progress)
+        self.bulk_worker.finished.connect(self.on_bulk_finished)
+        self.bulk_worker.error.connect(self.on_bulk_error)
+        self.bulk_worker.start()
+
+    def on_bulk_finished(self, count):
+        self.centralWidget().setEnabled(True)
+        action = "Updated" if self.bulk_worker.update_data else "Deleted"
+        QMessageBox.information(self, "Success", f"{action} {count} contracts")
+        self.total_contracts = self.db.get_total_count(self.current_query)
+        total_pages = max(1, (self.total_contracts - 1) // self.contracts_per_page + 1)
+        self.load_page(min(self.current_page, total_pages))  # Reload current page to reflect changes
+
+    def on_bulk_error(self, error):
+        self.centralWidget().setEnabled(True)
+        action = "update" if self.bulk_worker.update_data else "delete"
+        QMessageBox.critical(self, "Error", f"Failed to {action} contracts: {error}")
+
+    def bulk_update(self, all_matches=False):
+        if all_matches and not self.current_query:
+            QMessageBox.warning(self, "Warning", "Run a search before updating all matches")
+            return
+        contract_ids = None if all_matches else self.selected_contract_ids()
+        if not all_matches and not contract_ids:
             QMessageBox.warning(self, "Warning", "No contracts selected for update")
             return
 
-        # In a real application, you'd want to show a dialog to let the user choose what to update.
-        # For this example, we'll just update a dummy field.
-        update_data = {'dummy_field': 'Updated'}
-        contract_ids = [self.results_table.item(row, 0).text() for row in selected_rows]
-        
-        try:
-            self.db.bulk_update(contract_ids, update_data)
-            QMessageBox.information(self, "Success", f"Updated {len(contract_ids)} contracts")
-            self.load_page(self.current_page)  # Reload current page to reflect changes
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to update contracts: {e}")
-            logger.error(f"Bulk update failed: {e}", exc_info=True)
+        fields = [column for column in COLUMN_FIELDS if column != 'notice_id']
+        field, ok = QInputDialog.getItem(self, "Bulk Update", "Field to update:", fields, 0, False)
+        if not ok:
+            return
+        value, ok = QInputDialog.getText(self, "Bulk Update", f"New value for {field}:")
+        if not ok:
+            return
 
-    def bulk_delete(self):
-        selected_rows = set(index.row() for index in self.results_table.selectedIndexes())
-        if not selected_rows:
+        # Count the whole query, not the rows currently displayed
+        count = self.db.get_total_count(self.current_query) if all_matches else len(contract_ids)
+        reply = QMessageBox.question(self, "Confirm Update",
+                                     f"Are you sure you want to set {field} on {count} contracts?",
+                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
+
+        if reply == QMessageBox.Yes:
+            query = self.current_query if all_matches else None
+            self.start_bulk_operation(contract_ids, query, {field: value})
+
+    def bulk_delete(self, all_matches=False):
+        if all_matches and not self.current_query:
+            QMessageBox.warning(self, "Warning", "Run a search before deleting all matches")
+            return
+        contract_ids = None if all_matches else self.selected_contract_ids()
+        if not all_matches and not contract_ids:
             QMessageBox.warning(self, "Warning", "No contracts selected for deletion")
             return
 
+        # Count the whole query, not the rows currently displayed
+        count = self.db.get_total_count(self.current_query) if all_matches else len(contract_ids)
         reply = QMessageBox.question(self, "Confirm Deletion", 
-                                     f"Are you sure you want to delete {len(selected_rows)} contracts?",
+                                     f"Are you sure you want to delete {count} contracts?",
                                      QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         
         if reply == QMessageBox.Yes:
-            contract_ids = [self.results_table.item(row, 0).text() for row in selected_rows]
-            try:
-                self.db.bulk_delete(contract_ids)
-                QMessageBox.information(self, "Success", f"Deleted {len(contract_ids)} contracts")
-                self.load_page(self.current_page)  # Reload current page to reflect changes
-            except Exception as e:
-                QMessageBox.critical(self, "Error", f"Failed to delete contracts: {e}")
-                logger.error(f"Bulk delete failed: {e}", exc_info=True)
+            query = self.current_query if all_matches else None
+            self.start_bulk_operation(contract_ids, query)
 
     def export_results(self):
         if self.total_contracts == 0:
@@ -427,16 +699,33 @@ class MainWindow(QMainWindow):
                 QMessageBox.critical(self, "Error", f"Failed to export results: {e}")
                 logger.error(f"Failed to export results: {e}", exc_info=True)
 
-    def display_entities(self, entities):
-        entity_text = "Extracted Entities:\n\n"
-        for entity_type, entity_list in entities.items():
-            entity_text += f"{entity_type}:\n"
-            for entity in entity_list:
-                entity_text += f"- {entity}\n"
-            entity_text += "\n"
-        QMessageBox.information(self, "Extracted Entities", entity_text)
+    def display_insights(self):
+        insights_text = f"Claude Summary:\n{self.ai_summary}\n\n" if self.ai_summary else ""
+        if self.ai_entities:
+            insights_text += "Extracted Entities:\n\n"
+            for entity_type, entity_list in self.ai_entities.items():
+                insights_text += f"{entity_type}:\n"
+                for entity in entity_list:
+                    insights_text += f"- {entity}\n"
+                insights_text += "\n"
+        self.insights_view.setPlainText(insights_text)
 
     def closeEvent(self, event):
+        for worker in self.analytics_workers:
+            worker.wait()
+        if self.bulk_worker and self.bulk_worker.isRunning():
+            self.bulk_worker.wait()
+        if self.archive_worker and self.archive_worker.isRunning():
+            self.archive_worker.wait()
+        if self.enrichment_worker and self.enrichment_worker.isRunning():
+            self.enrichment_worker.requestInterruption()
+            self.enrichment_worker.wait()
+        self.cancel_search()
+        for worker in self.cancelled_workers:
+            worker.wait()
+        self.cancel_prefetch()
+        for prefetcher in list(self.prefetchers):
+            prefetcher.wait()
         try:
             self.db.close()
             logger.info("Database connection closed")
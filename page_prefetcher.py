@@ -0,0 +1,29 @@
+from PyQt5.QtCore import QThread
+import logging
+
+logger = logging.getLogger(__name__)
+
+class PagePrefetcher(QThread):
+    """Load and decode pages adjacent to the visible one into the database result cache.
+
+    Rather than keeping a separate prefetch buffer, pages land in ContractDatabase's
+    bounded LRU result cache, which load_page already reads from.
+    """
+
+    def __init__(self, db, query, pages, contracts_per_page):
+        super().__init__()
+        self.db = db
+        self.query = query
+        self.pages = pages
+        self.contracts_per_page = contracts_per_page
+
+    def run(self):
+        for page in self.pages:
+            if self.isInterruptionRequested():
+                logger.debug("Page prefetch cancelled")
+                return
+            try:
+                offset = (page - 1) * self.contracts_per_page
+                self.db.search_contracts(self.query, limit=self.contracts_per_page, offset=offset)
+            except Exception as e:
+                logger.error(f"Failed to prefetch page {page}: {e}", exc_info=True)
@@ -0,0 +1,142 @@
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Lower values are admitted first
+INTERACTIVE = 0
+BACKGROUND = 1
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, server errors and "overloaded"
+RETRYABLE_STATUS_CODES = {408, 409, 429, 500, 502, 503, 504, 529}
+
+
+class TokenBucket:
+    """Refills continuously at rate_per_minute up to a capacity of one minute's worth."""
+
+    def __init__(self, rate_per_minute: float, clock=time.monotonic):
+        self.capacity = float(rate_per_minute)
+        self.tokens = float(rate_per_minute)
+        self.rate = rate_per_minute / 60.0
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def time_until(self, amount: float) -> float:
+        """Seconds until amount can be consumed (requests larger than capacity wait for a full bucket)."""
+        self._refill()
+        needed = min(amount, self.capacity) - self.tokens
+        return max(0.0, needed / self.rate)
+
+    def consume(self, amount: float):
+        """Take amount from the bucket; a negative amount refunds, up to capacity."""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens - amount)
+
+
+def retry_after_seconds(error: Exception):
+    """Return the server's requested delay from a retry-after(-ms) header, if any."""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None) or {}
+    try:
+        if 'retry-after-ms' in headers:
+            return float(headers['retry-after-ms']) / 1000.0
+        if 'retry-after' in headers:
+            return float(headers['retry-after'])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    if getattr(error, 'status_code', None) in RETRYABLE_STATUS_CODES:
+        return True
+    # Connection failures and timeouts carry no status code
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError')
+
+
+class RequestScheduler:
+    """Admit API calls within request/token per-minute quotas and a concurrency limit.
+
+    Waiting calls are admitted in priority order, so interactive searches overtake
+    background work. Retryable failures back off exponentially with jitter,
+    honoring retry-after, and a rate limit pauses admission for every caller.
+    """
+
+    def __init__(self, requests_per_minute: int = 50, tokens_per_minute: int = 40000, max_concurrency: int = 4,
+                 max_retries: int = 5, base_delay: float = 1.0, max_delay: float = 60.0):
+        # Waits are in real time, so the buckets use the real clock too
+        self.request_bucket = TokenBucket(requests_per_minute)
+        self.token_bucket = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.active = 0
+        self.paused_until = 0.0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._condition = threading.Condition()
+
+    def _acquire(self, estimated_tokens: int, priority: int):
+        with self._condition:
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            while True:
+                delay = None
+                if self._waiting[0] == ticket and self.active < self.max_concurrency:
+                    delay = max(self.paused_until - time.monotonic(),
+                                self.request_bucket.time_until(1),
+                                self.token_bucket.time_until(estimated_tokens))
+                    if delay <= 0:
+                        break
+                self._condition.wait(delay)
+            heapq.heappop(self._waiting)
+            self.request_bucket.consume(1)
+            self.token_bucket.consume(estimated_tokens)
+            self.active += 1
+            self._condition.notify_all()
+
+    def _release(self, estimated_tokens: int, result=None):
+        with self._condition:
+            self.active -= 1
+            usage = getattr(result, 'usage', None)
+            if usage is not None:
+                # Settle the estimate against what the response actually used
+                used = getattr(usage, 'input_tokens', 0) + getattr(usage, 'output_tokens', 0)
+                self.token_bucket.consume(used - estimated_tokens)
+            self._condition.notify_all()
+
+    def _backoff(self, attempt: int, error: Exception) -> float:
+        delay = retry_after_seconds(error)
+        if delay is None:
+            delay = min(self.max_delay, self.base_delay * 2 ** attempt) * random.uniform(0.5, 1.0)
+        if getattr(error, 'status_code', None) in (429, 529):
+            with self._condition:
+                self.paused_until = max(self.paused_until, time.monotonic() + delay)
+        return delay
+
+    def submit(self, func, estimated_tokens: int = 1000, priority: int = INTERACTIVE):
+        """Run func() once the quotas allow it, retrying retryable errors; returns its result."""
+        for attempt in range(self.max_retries + 1):
+            self._acquire(estimated_tokens, priority)
+            result = None
+            try:
+                result = func()
+                return result
+            except Exception as e:
+                if not is_retryable(e) or attempt == self.max_retries:
+                    raise
+                delay = self._backoff(attempt, e)
+                logger.warning(f"Retrying API call in {delay:.1f}s after error: {e}")
+            finally:
+                self._release(estimated_tokens, result)
+            time.sleep(delay)
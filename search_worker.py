@@ -7,41 +7,61 @@ logger = logging.getLogger(__name__)
 class SearchWorker(QThread):
     finished = pyqtSignal(object)
     error = pyqtSignal(str)
+    # Progressive updates, emitted before finished
+    results_ready = pyqtSignal(object)
+    analysis_progress = pyqtSignal(object)
+    summary_progress = pyqtSignal(str)
+    entities_progress = pyqtSignal(object)
 
-    def __init__(self, claude_search, db, query):
+    def __init__(self, claude_search, db, query, limit=100):
         super().__init__()
         self.claude_search = claude_search
         self.db = db
         self.query = query
+        self.limit = limit
 
     def run(self):
         try:
+            # Show the plain database hits before any Claude call
+            contracts = self.db.search_contracts(self.query, limit=self.limit)
+            logger.info(f"Found {len(contracts)} contracts in initial search")
+            self.results_ready.emit(contracts)
+            if self.isInterruptionRequested():
+                return
+
             # Convert the query to a string for Claude's enhance_query method
             query_str = json.dumps(self.query)
             
             # Enhance the query using Claude AI
             enhanced_query = self.claude_search.enhance_query(query_str)
             logger.info(f"Enhanced query: {enhanced_query}")
-
-            # Perform the database search with the original query
-            contracts = self.db.search_contracts(self.query, limit=100)
-            logger.info(f"Found {len(contracts)} contracts in initial search")
+            if self.isInterruptionRequested():
+                return
 
             # Convert contracts to JSON for Claude's analysis
             contracts_key = json.dumps(contracts)
 
-            # Perform advanced analysis on the contracts
-            analyzed_contracts = self.claude_search.advanced_analyze_contracts(contracts_key, enhanced_query)
+            # Perform advanced analysis on the contracts, streaming scores as they arrive
+            analyzed_contracts = self.claude_search.stream_analyze_contracts(
+                contracts_key, enhanced_query, self.analysis_progress.emit, self.isInterruptionRequested)
             logger.info(f"Analyzed {len(analyzed_contracts)} contracts")
+            if self.isInterruptionRequested():
+                return
 
             # Prepare a summary of the top 5 results
             result_key = json.dumps([c for c in analyzed_contracts[:5]])
-            summary = self.claude_search.summarize_results(result_key)
+            summary = self.claude_search.stream_summarize_results(
+                result_key, self.summary_progress.emit, self.isInterruptionRequested)
             logger.info("Generated summary of top 5 results")
+            if self.isInterruptionRequested():
+                return
 
             # Extract entities from the contracts
-            entities = self.claude_search.extract_entities(contracts_key)
+            entities = self.claude_search.stream_extract_entities(
+                contracts_key, self.entities_progress.emit, self.isInterruptionRequested)
             logger.info("Extracted entities from contracts")
+            if self.isInterruptionRequested():
+                return
 
             # Emit the results
             self.finished.emit((enhanced_query, analyzed_contracts, summary, entities))
@@ -1,7 +1,7 @@
 import logging
 import json
 from datetime import datetime
-from typing import Any, Dict
+from typing import Any, Dict, Iterator, List, Tuple
 
 def setup_logging(log_file: str = 'sam_contract_filter.log') -> logging.Logger:
     """Set up logging configuration."""
@@ -35,27 +35,69 @@ def safe_json_loads(json_string: str) -> Dict[str, Any]:
         logging.error(f"Failed to parse JSON: {json_string}")
         return {}
 
-def sanitize_input(input_string: str) -> str:
-    """Sanitize input string to prevent SQL injection."""
-    return input_string.replace("'", "''")
-
 def validate_contract_data(contract: Dict[str, Any]) -> bool:
     """Validate contract data to ensure all required fields are present."""
     required_fields = ['Notice ID', 'Title', 'Department/Ind. Agency', 'Date Posted']
     return all(field in contract for field in required_fields)
 
-def create_search_query(search_params: Dict[str, Any]) -> str:
-    """Create a SQL query string from search parameters."""
+def build_search_clause(search_params: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Create a SQL WHERE clause and its bound parameters from search parameters."""
     conditions = []
+    params = []
     for key, value in search_params.items():
-        if value:
-            if isinstance(value, list):
-                conditions.append(f"{key} IN ({','.join(['?']*len(value))})")
-            else:
-                conditions.append(f"{key} = ?")
-    
+        if not value:
+            continue
+        if key == 'keyword':
+            conditions.append("(title LIKE ? OR synopsis LIKE ? OR contract_description LIKE ?)")
+            params.extend([f"%{value}%"] * 3)
+        elif key == 'date_posted_start':
+            conditions.append("date_posted >= date(?)")
+            params.append(value)
+        elif key == 'date_posted_end':
+            # Posting dates carry a time, so include the whole end day
+            conditions.append("date_posted < date(?, '+1 day')")
+            params.append(value)
+        elif key in ('tag', 'entity'):
+            # Filter on offline enrichment results through the indexed side tables
+            table, column = ('contract_tags', 'tag') if key == 'tag' else ('contract_entities', 'entity')
+            values = value if isinstance(value, list) else [value]
+            conditions.append(f"notice_id IN (SELECT notice_id FROM {table} WHERE {column} IN ({','.join(['?']*len(values))}))")
+            params.extend(values)
+        elif isinstance(value, tuple):
+            low, high = value
+            if low:
+                conditions.append(f"{key} >= ?")
+                params.append(float(low))
+            if high:
+                conditions.append(f"{key} <= ?")
+                params.append(float(high))
+        elif isinstance(value, list):
+            conditions.append(f"{key} IN ({','.join(['?']*len(value))})")
+            params.extend(value)
+        else:
+            conditions.append(f"{key} = ?")
+            params.append(value)
+
     if conditions:
-        return "WHERE " + " AND ".join(conditions)
-    return ""
+        return "WHERE " + " AND ".join(conditions), params
+    return "", params
+
+def canonicalize_query(search_params: Dict[str, Any]) -> str:
+    """Return a stable string form of search parameters for use as a cache key."""
+    normalized = {}
+    for key, value in search_params.items():
+        if not value:
+            continue
+        if isinstance(value, list):
+            value = sorted(value)
+        elif isinstance(value, tuple):
+            value = list(value)
+        normalized[key] = value
+    return json.dumps(normalized, sort_keys=True)
+
+def chunked(items: List[Any], size: int) -> Iterator[List[Any]]:
+    """Yield successive lists of at most size items."""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
 
 logger = setup_logging()